@@ -0,0 +1,61 @@
+import logging
+import random
+import time
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+_replica_alias = ContextVar("replica_alias", default=None)
+_replica_health = {}
+
+def replica_is_healthy(alias):
+    now = time.monotonic()
+    cached = _replica_health.get(alias)
+    if cached and now - cached[1] < settings.DATABASE_REPLICA_HEALTH_CHECK_INTERVAL:
+        return cached[0]
+
+    try:
+        connection = connections[alias]
+        connection.ensure_connection()
+        healthy = connection.is_usable()
+    except DatabaseError as error:
+        logger.warning(f"Réplica '{alias}' indisponível: {error}")
+        healthy = False
+
+    _replica_health[alias] = (healthy, now)
+    return healthy
+
+def healthy_replicas():
+    return [alias for alias in settings.DATABASE_REPLICAS if replica_is_healthy(alias)]
+
+def start_replica_reads():
+    # Uma única réplica por requisição, para não misturar atrasos de replicação diferentes
+    replicas = healthy_replicas()
+    return _replica_alias.set(random.choice(replicas) if replicas else None)
+
+def stop_replica_reads(token):
+    _replica_alias.reset(token)
+
+class PrimaryReplicaRouter:
+    """
+    Escritas sempre no primário ("default"). Leituras vão para a réplica
+    escolhida por start_replica_reads; fora disso, ou sem réplica saudável,
+    ficam no primário.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _replica_alias.get() or "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {"default", *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
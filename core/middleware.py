@@ -0,0 +1,87 @@
+import logging
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli é opcional
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+def parse_accept_encoding(header):
+    encodings = {}
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        encodings[name.strip().lower()] = quality
+    return encodings
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Comprime respostas com brotli (se instalado) ou gzip, conforme o
+    Accept-Encoding do cliente, a partir de COMPRESSION_MIN_SIZE bytes.
+    Respostas marcadas com Cache-Control: no-store não são comprimidas.
+    """
+
+    max_random_bytes = 100
+
+    def available_encodings(self):
+        return ("br", "gzip") if brotli is not None else ("gzip",)
+
+    def choose_encoding(self, request):
+        accepted = parse_accept_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        candidates = [
+            (accepted.get(name, accepted.get("*", 0.0)), -index, name)
+            for index, name in enumerate(self.available_encodings())
+        ]
+        quality, _, name = max(candidates)
+        return name if quality > 0 else None
+
+    def compress(self, content, encoding):
+        if encoding == "br":
+            return brotli.compress(content, quality=getattr(settings, "COMPRESSION_BROTLI_QUALITY", 5))
+        return compress_string(content, max_random_bytes=self.max_random_bytes)
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header("Content-Encoding"):
+            return response
+
+        # Respostas com credenciais (tokens) vêm com no-store e não são comprimidas:
+        # o brotli não tem o preenchimento aleatório do gzip contra o BREACH
+        if "no-store" in response.get("Cache-Control", ""):
+            return response
+
+        if len(response.content) < getattr(settings, "COMPRESSION_MIN_SIZE", 1024):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        encoding = self.choose_encoding(request)
+        if encoding is None:
+            return response
+
+        compressed_content = self.compress(response.content, encoding)
+        if len(compressed_content) >= len(response.content):
+            return response
+
+        logger.debug(f"Resposta comprimida com {encoding}: {len(response.content)} -> {len(compressed_content)} bytes")
+        response.content = compressed_content
+        response.headers["Content-Length"] = str(len(response.content))
+
+        # ETag forte vira fraca, como no GZipMiddleware do Django (RFC 9110 8.8.1)
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
@@ -0,0 +1,27 @@
+import logging
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson é opcional
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Renderiza JSON com orjson quando disponível e cai para o JSONRenderer
+    padrão do DRF (json da stdlib) caso contrário ou quando a saída indentada
+    for solicitada.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=self.encoder_class().default, option=orjson.OPT_NON_STR_KEYS)
+        # Mesmo escape de \u2028 e \u2029 feito pelo JSONRenderer
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
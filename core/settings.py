@@ -25,6 +25,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "core.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -54,14 +55,37 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "core.wsgi.application"
 
+# Banco de dados — conexões persistentes por worker (o Django 5.0 com psycopg2
+# não tem pool próprio: o total de conexões é workers do gunicorn x aliases).
+DB_CONN_MAX_AGE = int(os.environ.get("DB_CONN_MAX_AGE", "600"))
+DB_CONN_HEALTH_CHECKS = os.environ.get("DB_CONN_HEALTH_CHECKS", "true").lower() == "true"
+DB_SSL_REQUIRE = os.environ.get("DB_SSL_REQUIRE", "true").lower() == "true"
+
 DATABASES = {
     "default": dj_database_url.config(
         default=os.environ["DATABASE_URL"],
-        conn_max_age=600,
-        ssl_require=True,
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=DB_CONN_HEALTH_CHECKS,
+        ssl_require=DB_SSL_REQUIRE,
     )
 }
 
+# Réplicas de leitura: DATABASE_REPLICA_URLS="postgres://...,postgres://..."
+for index, url in enumerate(filter(None, os.environ.get("DATABASE_REPLICA_URLS", "").split(",")), start=1):
+    DATABASES[f"replica_{index}"] = dj_database_url.parse(
+        url.strip(),
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=DB_CONN_HEALTH_CHECKS,
+        ssl_require=DB_SSL_REQUIRE,
+        test_options={"MIRROR": "default"},
+    )
+
+DATABASE_ROUTERS = ["core.db_router.PrimaryReplicaRouter"]
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+# Após uma escrita, as leituras do mesmo usuário ficam no primário por esse tempo
+DATABASE_REPLICA_PIN_SECONDS = int(os.environ.get("DATABASE_REPLICA_PIN_SECONDS", "5"))
+DATABASE_REPLICA_HEALTH_CHECK_INTERVAL = int(os.environ.get("DATABASE_REPLICA_HEALTH_CHECK_INTERVAL", "30"))
+
 AUTH_USER_MODEL = "users.CustomUser"
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -92,13 +116,32 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.AllowAny",
     ],
     "DEFAULT_RENDERER_CLASSES": [
-        "rest_framework.renderers.JSONRenderer",
+        "core.renderers.FastJSONRenderer",
     ],
     "DEFAULT_PARSER_CLASSES": [
         "rest_framework.parsers.JSONParser",
     ],
 }
 
+# Compressão de respostas (brotli é usado se o pacote estiver instalado)
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get("COMPRESSION_BROTLI_QUALITY", "5"))
+
+# Tarefas de segundo plano (worker: python manage.py run_jobs)
+TASKS_ALWAYS_EAGER = os.environ.get("TASKS_ALWAYS_EAGER", "false").lower() == "true"
+TASKS_CONCURRENCY = int(os.environ.get("TASKS_CONCURRENCY", "4"))
+TASKS_POLL_INTERVAL = float(os.environ.get("TASKS_POLL_INTERVAL", "1"))
+TASKS_MAX_ATTEMPTS = int(os.environ.get("TASKS_MAX_ATTEMPTS", "3"))
+TASKS_RETRY_DELAY = int(os.environ.get("TASKS_RETRY_DELAY", "10"))
+TASKS_HEARTBEAT_INTERVAL = int(os.environ.get("TASKS_HEARTBEAT_INTERVAL", "30"))
+TASKS_STALE_AFTER = int(os.environ.get("TASKS_STALE_AFTER", "120"))
+
+# Tamanho dos lotes de DELETE ao apagar tweets e contas definitivamente
+PURGE_BATCH_SIZE = int(os.environ.get("PURGE_BATCH_SIZE", "1000"))
+
+# Lado máximo (px) das imagens de perfil, redimensionadas pelo worker; 0 desativa
+PROFILE_IMAGE_MAX_SIZE = int(os.environ.get("PROFILE_IMAGE_MAX_SIZE", "0"))
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=1),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
@@ -0,0 +1,30 @@
+import os
+import tempfile
+
+os.environ.setdefault("SECRET_KEY", "chave-de-teste-com-pelo-menos-32-bytes!")
+os.environ.setdefault("DATABASE_URL", "sqlite:///test.sqlite3")
+
+from .settings import *  # noqa: E402,F401,F403
+
+# Dois aliases SQLite locais: replica_1 espelha o default, como uma réplica de verdade.
+# O banco de teste fica em arquivo (não em memória) para as threads do worker
+# esperarem o lock em vez de falhar com "database table is locked".
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "test.sqlite3",
+        "TEST": {"NAME": os.path.join(tempfile.mkdtemp(prefix="db-test-"), "test.sqlite3")},
+    },
+    "replica_1": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "test.sqlite3",
+        "TEST": {"MIRROR": "default"},
+    },
+}
+DATABASE_REPLICAS = ["replica_1"]
+
+ALLOWED_HOSTS = ["testserver"]
+SECURE_SSL_REDIRECT = False
+PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+MEDIA_ROOT = tempfile.mkdtemp(prefix="media-test-")
+TASKS_ALWAYS_EAGER = False
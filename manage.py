@@ -2,7 +2,9 @@ import os
 import sys
 
 def main():
-    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+    # "manage.py test" usa as configurações de teste (SQLite com um alias de réplica)
+    default_settings = "core.test_settings" if sys.argv[1:2] == ["test"] else "core.settings"
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", default_settings)
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
@@ -1,22 +1,52 @@
 from django.contrib import admin
-from .models import CustomUser, Tweet
+from .models import BackgroundTask, CustomUser, Tweet
+from .tasks import delete_accounts, delete_tweets
+
+class BatchDeleteAdminMixin:
+    """
+    Exclusões pelo admin (ação "excluir selecionados" e botão do formulário)
+    passam pelo worker em lotes, em vez do coletor de cascata do Django, que
+    carregaria todas as curtidas e seguidores em memória.
+    """
+
+    def get_deleted_objects(self, objs, request):
+        # A página de confirmação também usaria o coletor; lista só os objetos escolhidos
+        objs = list(objs)
+        return [str(obj) for obj in objs], {self.model._meta.verbose_name_plural: len(objs)}, set(), []
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, self.model.objects.filter(pk=obj.pk))
 
 @admin.register(CustomUser)
-class CustomUserAdmin(admin.ModelAdmin):
+class CustomUserAdmin(BatchDeleteAdminMixin, admin.ModelAdmin):
     list_display = ("id", "username", "email", "is_staff", "is_active")
     search_fields = ("username", "email")
     list_filter = ("is_staff", "is_active")
     ordering = ("id",)
 
+    def delete_queryset(self, request, queryset):
+        delete_accounts(list(queryset.values_list("id", flat=True)))
+
 @admin.register(Tweet)
-class TweetAdmin(admin.ModelAdmin):
-    list_display = ("id", "author", "content", "created_at", "likes_count")
+class TweetAdmin(BatchDeleteAdminMixin, admin.ModelAdmin):
+    list_display = ("id", "author", "content", "created_at", "is_deleted", "likes_count")
     search_fields = ("content", "author__username")
-    list_filter = ("created_at",)
+    list_filter = ("created_at", "is_deleted")
     ordering = ("-created_at",)
 
     def likes_count(self, obj):
         return obj.likes.count()
     likes_count.short_description = "Curtidas"
 
-print("Modelos registrados no Django Admin: CustomUser e Tweet.")
+    def delete_queryset(self, request, queryset):
+        delete_tweets(queryset)
+
+@admin.register(BackgroundTask)
+class BackgroundTaskAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "status", "attempts", "created_at", "started_at", "finished_at")
+    search_fields = ("name",)
+    list_filter = ("status", "name")
+    ordering = ("-created_at",)
+    readonly_fields = ("created_at", "started_at", "finished_at", "last_error")
+
+print("Modelos registrados no Django Admin: CustomUser, Tweet e BackgroundTask.")
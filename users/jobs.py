@@ -0,0 +1,166 @@
+import logging
+import threading
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+from functools import wraps
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Min, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import BackgroundTask
+
+logger = logging.getLogger(__name__)
+
+def job(func=None, *, max_attempts=None):
+    """
+    Registra uma função como tarefa de segundo plano. A função continua
+    podendo ser chamada diretamente; func.delay(...) a enfileira.
+    Os argumentos precisam ser serializáveis em JSON.
+    """
+
+    def decorator(func):
+        name = f"{func.__module__}.{func.__name__}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            return func(*args, **kwargs)
+
+        def delay(*args, **kwargs):
+            return enqueue(name, args, kwargs, max_attempts=max_attempts)
+
+        wrapper.delay = delay
+        wrapper.job_name = name
+        return wrapper
+
+    return decorator(func) if func else decorator
+
+def enqueue(name, args=(), kwargs=None, max_attempts=None):
+    task_data = {
+        "name": name,
+        "args": list(args),
+        "kwargs": kwargs or {},
+        "max_attempts": max_attempts or settings.TASKS_MAX_ATTEMPTS,
+    }
+
+    # Só enfileira depois do commit, para o worker não ver dados que ainda podem sofrer rollback
+    def create():
+        task = BackgroundTask.objects.create(**task_data)
+        logger.debug(f"Tarefa {task.id} enfileirada: {name}")
+        if settings.TASKS_ALWAYS_EAGER:
+            task.status = BackgroundTask.STATUS_RUNNING
+            task.attempts = 1
+            task.started_at = task.heartbeat_at = timezone.now()
+            task.save(update_fields=["status", "attempts", "started_at", "heartbeat_at"])
+            run_task(task)
+
+    transaction.on_commit(create)
+
+def claim_tasks(limit):
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            BackgroundTask.objects.select_for_update(skip_locked=True)
+            .filter(status=BackgroundTask.STATUS_PENDING, run_after__lte=now)
+            .order_by("run_after", "id")
+            .values_list("id", flat=True)[:limit]
+        )
+        BackgroundTask.objects.filter(id__in=ids).update(
+            status=BackgroundTask.STATUS_RUNNING,
+            started_at=now,
+            heartbeat_at=now,
+            attempts=F("attempts") + 1,
+        )
+    return list(BackgroundTask.objects.filter(id__in=ids).order_by("run_after", "id"))
+
+def run_task(task):
+    try:
+        import_string(task.name)(*task.args, **task.kwargs)
+    except Exception as error:
+        fail_task(task, error)
+    else:
+        task.status = BackgroundTask.STATUS_DONE
+        task.finished_at = timezone.now()
+        task.save(update_fields=["status", "finished_at"])
+        logger.info(f"Tarefa {task.id} ({task.name}) concluída em {task.finished_at - task.started_at}")
+
+@contextmanager
+def heartbeat(task, interval=None):
+    """
+    Enquanto o bloco roda, uma thread auxiliar atualiza heartbeat_at; assim
+    requeue_stale_tasks distingue tarefa longa de worker que morreu.
+    """
+    interval = interval or settings.TASKS_HEARTBEAT_INTERVAL
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(interval):
+                BackgroundTask.objects.filter(id=task.id, status=BackgroundTask.STATUS_RUNNING).update(
+                    heartbeat_at=timezone.now()
+                )
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f"heartbeat-{task.id}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+def fail_task(task, error):
+    task.last_error = "".join(traceback.format_exception(error))
+    if task.attempts < task.max_attempts:
+        delay = settings.TASKS_RETRY_DELAY * 2 ** (task.attempts - 1)
+        task.status = BackgroundTask.STATUS_PENDING
+        task.run_after = timezone.now() + timedelta(seconds=delay)
+        logger.warning(f"Tarefa {task.id} ({task.name}) falhou, nova tentativa em {delay}s: {error}")
+    else:
+        task.status = BackgroundTask.STATUS_FAILED
+        task.finished_at = timezone.now()
+        logger.error(f"Tarefa {task.id} ({task.name}) falhou após {task.attempts} tentativas: {error}")
+    task.save(update_fields=["status", "run_after", "finished_at", "last_error"])
+
+def requeue_stale_tasks():
+    # Sem heartbeat há TASKS_STALE_AFTER segundos, o worker morreu no meio da tarefa
+    now = timezone.now()
+    limit = now - timedelta(seconds=settings.TASKS_STALE_AFTER)
+    stale = BackgroundTask.objects.filter(status=BackgroundTask.STATUS_RUNNING).filter(
+        Q(heartbeat_at__lt=limit) | Q(heartbeat_at__isnull=True, started_at__lt=limit)
+    )
+    # Quem já gastou todas as tentativas falha de vez, para uma tarefa que derruba o worker não voltar sempre
+    failed = stale.filter(attempts__gte=F("max_attempts")).update(
+        status=BackgroundTask.STATUS_FAILED,
+        finished_at=now,
+        last_error="Worker parou de responder durante a execução (sem heartbeat).",
+    )
+    requeued = stale.update(status=BackgroundTask.STATUS_PENDING, run_after=now)
+    if failed:
+        logger.error(f"{failed} tarefas travadas marcadas como falhas após esgotar as tentativas")
+    if requeued:
+        logger.warning(f"{requeued} tarefas travadas voltaram para a fila")
+    return requeued
+
+def queue_metrics(sample_size=500):
+    now = timezone.now()
+    pending = BackgroundTask.objects.filter(status=BackgroundTask.STATUS_PENDING)
+    oldest = pending.filter(run_after__lte=now).aggregate(oldest=Min("run_after"))["oldest"]
+
+    recent = BackgroundTask.objects.filter(status=BackgroundTask.STATUS_DONE).order_by("-finished_at")
+    timings = list(recent.values_list("created_at", "started_at", "finished_at")[:sample_size])
+    waits = [(started - created).total_seconds() for created, started, _ in timings]
+    runs = [(finished - started).total_seconds() for _, started, finished in timings]
+
+    return {
+        "queue_depth": pending.count(),
+        "running": BackgroundTask.objects.filter(status=BackgroundTask.STATUS_RUNNING).count(),
+        "failed": BackgroundTask.objects.filter(status=BackgroundTask.STATUS_FAILED).count(),
+        "oldest_pending_seconds": (now - oldest).total_seconds() if oldest else 0,
+        "avg_wait_seconds": sum(waits) / len(waits) if waits else 0,
+        "avg_run_seconds": sum(runs) / len(runs) if runs else 0,
+        "max_run_seconds": max(runs, default=0),
+    }
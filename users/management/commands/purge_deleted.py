@@ -0,0 +1,30 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from users.models import CustomUser, Tweet
+from users.purge import purge_tweets, purge_user
+
+class Command(BaseCommand):
+    help = "Apaga definitivamente, em lotes, tweets marcados como excluídos e as contas informadas."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than", type=int, default=0, help="Só tweets excluídos há mais de N minutos.")
+        parser.add_argument("--user", type=int, action="append", default=[], help="ID de conta a remover (pode repetir).")
+        parser.add_argument("--batch-size", type=int, default=settings.PURGE_BATCH_SIZE)
+
+    def progress(self, step, done):
+        self.stdout.write(f"[{step}] {done} registros removidos")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+
+        for user in CustomUser.objects.filter(id__in=options["user"]):
+            self.stdout.write(f"Removendo a conta {user.username} (ID: {user.id})...")
+            report = purge_user(user, batch_size, self.progress)
+            self.stdout.write(self.style.SUCCESS(f"Conta {user.username} removida: {report}"))
+
+        limit = timezone.now() - timedelta(minutes=options["older_than"])
+        report = purge_tweets(Tweet.objects.filter(deleted_at__lte=limit), batch_size, self.progress)
+        self.stdout.write(self.style.SUCCESS(f"Tweets excluídos removidos: {report}"))
@@ -0,0 +1,85 @@
+import logging
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from users.models import BackgroundTask
+from users.jobs import claim_tasks, heartbeat, queue_metrics, requeue_stale_tasks, run_task
+
+logger = logging.getLogger(__name__)
+
+def run_in_thread(task):
+    close_old_connections()
+    try:
+        with heartbeat(task):
+            run_task(task)
+    except Exception:
+        # run_task já trata erros da tarefa; aqui só sobra falha ao gravar o resultado.
+        # Sem heartbeat, requeue_stale_tasks devolve a tarefa à fila depois.
+        logger.exception(f"Erro ao registrar o resultado da tarefa {task.id} ({task.name})")
+    finally:
+        close_old_connections()
+
+class Command(BaseCommand):
+    help = "Executa as tarefas de segundo plano enfileiradas no banco."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=settings.TASKS_CONCURRENCY)
+        parser.add_argument("--poll-interval", type=float, default=settings.TASKS_POLL_INTERVAL)
+        parser.add_argument("--metrics-interval", type=float, default=60)
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help=(
+                "Processa as tarefas já vencidas (incluindo as que vencerem durante a execução) e encerra. "
+                "Novas tentativas agendadas para depois ficam na fila para a próxima execução."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        concurrency = options["concurrency"]
+        self.stopping = False
+        previous_handlers = {signum: signal.signal(signum, self.stop) for signum in (signal.SIGTERM, signal.SIGINT)}
+
+        self.stdout.write(f"Worker iniciado com concorrência {concurrency}.")
+        running = set()
+        last_metrics = 0
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            while not self.stopping:
+                requeue_stale_tasks()
+                free_slots = concurrency - len(running)
+                tasks = claim_tasks(free_slots) if free_slots else []
+                running.update(executor.submit(run_in_thread, task) for task in tasks)
+
+                if time.monotonic() - last_metrics >= options["metrics_interval"]:
+                    logger.info(f"Métricas da fila: {queue_metrics()}")
+                    last_metrics = time.monotonic()
+
+                # Sem nada vencido nem em execução; retentativas com run_after futuro não são esperadas
+                if options["once"] and not tasks and not running:
+                    break
+
+                if running:
+                    _, running = wait(running, timeout=options["poll_interval"], return_when=FIRST_COMPLETED)
+                    running = set(running)
+                elif not tasks:
+                    time.sleep(options["poll_interval"])
+
+            wait(running)
+
+        for signum, handler in previous_handlers.items():
+            signal.signal(signum, handler)
+
+        delayed = BackgroundTask.objects.filter(status=BackgroundTask.STATUS_PENDING, run_after__gt=timezone.now()).count()
+        if delayed:
+            self.stdout.write(f"{delayed} tarefas agendadas para depois continuam na fila.")
+        self.stdout.write("Worker encerrado.")
+
+    def stop(self, signum, frame):
+        logger.info("Sinal recebido, encerrando o worker após as tarefas em execução.")
+        self.stopping = True
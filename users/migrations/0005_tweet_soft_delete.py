@@ -0,0 +1,45 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0004_backgroundtask_heartbeat_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tweet",
+            name="is_deleted",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="tweet",
+            name="deleted_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="tweet",
+            index=models.Index(
+                condition=models.Q(("is_deleted", False)),
+                fields=["-created_at"],
+                name="tweet_live_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tweet",
+            index=models.Index(
+                condition=models.Q(("is_deleted", False)),
+                fields=["author", "-created_at"],
+                name="tweet_live_author_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tweet",
+            index=models.Index(
+                condition=models.Q(("is_deleted", True)),
+                fields=["deleted_at"],
+                name="tweet_deleted_idx",
+            ),
+        ),
+    ]
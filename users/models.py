@@ -1,6 +1,7 @@
 import logging
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
@@ -14,10 +15,21 @@ class CustomUser(AbstractUser):
     )
     bio = models.TextField(blank=True, null=True, max_length=100)
     followers = models.ManyToManyField("self", symmetrical=False, related_name="following", blank=True)
+    content_version = models.PositiveIntegerField(default=0, editable=False)
+    content_updated_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    # Só mudam via bump_user_versions (UPDATE atômico); ver _do_update()
+    VERSION_FIELDS = ("content_version", "content_updated_at")
 
     def __str__(self):
         return self.username
 
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        # Uma instância carregada antes de um bump não pode regravar o contador antigo.
+        # Só o UPDATE deixa os campos de fora; INSERT (novo, force_insert, linha sumida) segue normal.
+        values = [value for value in values if value[0].name not in self.VERSION_FIELDS]
+        return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+
     def follow(self, user):
         if user != self and not self.is_following(user):
             self.following.add(user)
@@ -45,15 +57,31 @@ class CustomUser(AbstractUser):
             logger.info(f"{self.username} não segue ninguém. Nenhum tweet carregado.")
             return Tweet.objects.none()
         
-        tweets = Tweet.objects.filter(author__in=following).select_related("author").order_by('-created_at')
+        tweets = Tweet.objects.live().filter(author__in=following).select_related("author").order_by('-created_at')
         logger.info(f"{self.username} carregou {tweets.count()} tweets de usuários que segue.")
         return tweets
 
+class TweetQuerySet(models.QuerySet):
+    def live(self):
+        return self.filter(is_deleted=False)
+
 class Tweet(models.Model):
     author = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="tweets")
     content = models.TextField(max_length=280)
     created_at = models.DateTimeField(auto_now_add=True)
     likes = models.ManyToManyField(CustomUser, related_name="liked_tweets", blank=True)
+    is_deleted = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(blank=True, null=True)
+
+    objects = TweetQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Índices parciais: os feeds só leem tweets não excluídos, o purge só os excluídos
+            models.Index(fields=["-created_at"], condition=models.Q(is_deleted=False), name="tweet_live_created_idx"),
+            models.Index(fields=["author", "-created_at"], condition=models.Q(is_deleted=False), name="tweet_live_author_idx"),
+            models.Index(fields=["deleted_at"], condition=models.Q(is_deleted=True), name="tweet_deleted_idx"),
+        ]
 
     def __str__(self):
         return f"{self.author.username}: {self.content[:50]}"
@@ -78,3 +106,42 @@ class Tweet(models.Model):
 
     def get_likes_count(self):
         return self.likes.count()
+
+class FeedVersion(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+class BackgroundTask(models.Model):
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pendente"),
+        (STATUS_RUNNING, "Executando"),
+        (STATUS_DONE, "Concluída"),
+        (STATUS_FAILED, "Falhou"),
+    ]
+
+    name = models.CharField(max_length=200)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    heartbeat_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True, default="")
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "run_after"])]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
@@ -0,0 +1,115 @@
+import logging
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import CustomUser, Tweet
+from .versioning import bump_feed_version, bump_user_versions
+
+logger = logging.getLogger(__name__)
+
+Like = Tweet.likes.through
+Follow = CustomUser.followers.through
+
+def _log_progress(step, done):
+    logger.info(f"Purge [{step}]: {done} registros removidos até agora")
+
+def delete_in_batches(queryset, step, batch_size=None, progress=_log_progress, on_batch=None):
+    """
+    Remove as linhas do queryset em lotes de batch_size, cada lote na sua
+    própria transação, com DELETE direto (sem o coletor de cascata do
+    Django carregar as relações em memória nem disparar signals).
+    """
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    model = queryset.model
+    total = 0
+    while True:
+        with transaction.atomic():
+            ids = list(queryset.order_by("pk").values_list("pk", flat=True)[:batch_size])
+            if not ids:
+                break
+            if on_batch:
+                on_batch(ids)
+            batch = model._base_manager.filter(pk__in=ids)
+            # _raw_delete é o mesmo DELETE em massa que o Collector usa quando não há cascata
+            total += batch._raw_delete(batch.db)
+        progress(step, total)
+        if len(ids) < batch_size:
+            break
+    return total
+
+def soft_delete_tweets(queryset, batch_size=None, progress=None):
+    """
+    Marca os tweets como excluídos em lotes (cada lote com seu próprio
+    UPDATE e transação) e devolve quantos mudaram de fato. O UPDATE só pega
+    tweets ainda não excluídos, então chamadas concorrentes não contam o
+    mesmo tweet duas vezes.
+    """
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    total = 0
+    while True:
+        with transaction.atomic():
+            rows = list(queryset.filter(is_deleted=False).order_by("pk").values_list("pk", "author_id")[:batch_size])
+            if not rows:
+                break
+            count = Tweet.objects.filter(pk__in=[pk for pk, _ in rows], is_deleted=False).update(
+                is_deleted=True, deleted_at=timezone.now()
+            )
+            # update() não dispara post_save, então as versões dos feeds são atualizadas aqui
+            if count:
+                bump_user_versions(*{author_id for _, author_id in rows})
+        total += count
+        if progress:
+            progress("exclusão lógica", total)
+        if len(rows) < batch_size:
+            break
+    if total:
+        bump_feed_version()
+        logger.info(f"{total} tweets marcados como excluídos")
+    return total
+
+def purge_tweets(queryset, batch_size=None, progress=_log_progress):
+    """Apaga de vez tweets já marcados como excluídos, curtidas primeiro."""
+    tweets = queryset.filter(is_deleted=True)
+    likes = delete_in_batches(
+        Like.objects.filter(tweet__in=tweets.values("pk")), "curtidas", batch_size, progress
+    )
+    deleted = delete_in_batches(tweets, "tweets", batch_size, progress)
+    return {"likes": likes, "tweets": deleted}
+
+def purge_user(user, batch_size=None, progress=_log_progress):
+    """
+    Exclui uma conta com todos os tweets, curtidas e relações de seguidores
+    em lotes. A conta é desativada e os tweets somem dos feeds logo no início.
+    """
+    CustomUser.objects.filter(pk=user.pk).update(is_active=False)
+    soft_delete_tweets(Tweet.objects.filter(author=user), batch_size, progress)
+
+    def bump_liked_authors(ids):
+        author_ids = Tweet.objects.filter(id__in=Like.objects.filter(id__in=ids).values("tweet_id"))
+        bump_user_versions(*author_ids.values_list("author_id", flat=True).distinct())
+
+    def bump_follow_counterparts(ids):
+        rows = Follow.objects.filter(id__in=ids).values_list("from_customuser_id", "to_customuser_id")
+        bump_user_versions(*{user_id for row in rows for user_id in row if user_id != user.pk})
+
+    report = {
+        "likes_given": delete_in_batches(
+            Like.objects.filter(customuser=user), "curtidas dadas", batch_size, progress, bump_liked_authors
+        ),
+        "follows": delete_in_batches(
+            Follow.objects.filter(Q(from_customuser=user) | Q(to_customuser=user)),
+            "seguidores",
+            batch_size,
+            progress,
+            bump_follow_counterparts,
+        ),
+        **purge_tweets(Tweet.objects.filter(author=user), batch_size, progress),
+    }
+
+    # Sobraram só relações pequenas (grupos, permissões), o delete normal dá conta
+    CustomUser.objects.filter(pk=user.pk).delete()
+    bump_feed_version()
+    logger.info(f"Conta {user.username} (ID: {user.pk}) removida: {report}")
+    return report
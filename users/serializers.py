@@ -95,3 +95,17 @@ class TweetSerializer(serializers.ModelSerializer):
         liked = obj.likes.filter(id=request.user.id).exists()
         logger.debug(f"Usuário {request.user.username} curtiu o tweet {obj.id}: {liked}")
         return liked
+
+class CompactTweetSerializer(TweetSerializer):
+    author = serializers.PrimaryKeyRelatedField(read_only=True)
+
+def normalize_tweets(tweets, context):
+    # Cada autor é enviado uma única vez em "authors" em vez de repetido em todo tweet
+    authors = {}
+    for tweet in tweets:
+        authors.setdefault(tweet.author_id, tweet.author)
+    authors_data = UserSerializer(authors.values(), many=True, context=context).data
+    return {
+        "tweets": CompactTweetSerializer(tweets, many=True, context=context).data,
+        "authors": {str(author["id"]): author for author in authors_data},
+    }
@@ -0,0 +1,64 @@
+import logging
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import CustomUser, Tweet
+from .versioning import bump_feed_version, bump_user_versions
+
+logger = logging.getLogger(__name__)
+
+@receiver(post_save, sender=CustomUser)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    # O login só altera last_login, que não aparece em nenhuma resposta
+    if created or (update_fields and set(update_fields) <= {"last_login"}):
+        return
+    bump_user_versions(instance.id)
+    bump_feed_version()
+
+@receiver(pre_delete, sender=CustomUser)
+def user_deleted(sender, instance, **kwargs):
+    related_ids = set(instance.followers.values_list("id", flat=True))
+    related_ids |= set(instance.following.values_list("id", flat=True))
+    bump_user_versions(*related_ids)
+    bump_feed_version()
+
+@receiver(post_save, sender=Tweet)
+def tweet_saved(sender, instance, **kwargs):
+    bump_user_versions(instance.author_id)
+    bump_feed_version()
+
+@receiver(post_delete, sender=Tweet)
+def tweet_deleted(sender, instance, **kwargs):
+    bump_user_versions(instance.author_id)
+    bump_feed_version()
+
+@receiver(m2m_changed, sender=CustomUser.followers.through)
+def followers_changed(sender, instance, action, pk_set, **kwargs):
+    if action == "pre_clear":
+        # Guarda os envolvidos antes que as linhas sejam removidas
+        instance._cleared_follow_ids = set(instance.followers.values_list("id", flat=True)) | set(
+            instance.following.values_list("id", flat=True)
+        )
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    related_ids = pk_set if action != "post_clear" else getattr(instance, "_cleared_follow_ids", set())
+    bump_user_versions(instance.id, *related_ids)
+    bump_feed_version()
+
+@receiver(m2m_changed, sender=Tweet.likes.through)
+def likes_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear":
+        related = instance.liked_tweets if reverse else instance.likes
+        instance._cleared_like_ids = set(related.values_list("id", flat=True))
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    related_ids = pk_set if action != "post_clear" else getattr(instance, "_cleared_like_ids", set())
+    if reverse:
+        # instance é quem curtiu; os autores dos tweets também mudam (likes_count)
+        author_ids = Tweet.objects.filter(id__in=related_ids).values_list("author_id", flat=True)
+        bump_user_versions(instance.id, *author_ids)
+    else:
+        bump_user_versions(instance.author_id, *related_ids)
+    bump_feed_version()
@@ -0,0 +1,85 @@
+import logging
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from .jobs import job
+from .models import CustomUser, Tweet
+from .purge import purge_tweets, purge_user, soft_delete_tweets
+from .versioning import bump_feed_version, bump_user_versions
+
+logger = logging.getLogger(__name__)
+
+def is_default_profile_image(name):
+    return not name or name.endswith("profile_images/default.png")
+
+@job
+def resize_profile_image(user_id, image_name):
+    max_size = settings.PROFILE_IMAGE_MAX_SIZE
+    if not max_size or is_default_profile_image(image_name):
+        return
+    # O usuário pode ter trocado a imagem de novo antes da tarefa rodar
+    current = CustomUser.objects.filter(id=user_id, profile_image=image_name)
+    if not current.exists():
+        return
+
+    with default_storage.open(image_name, "rb") as image_file:
+        image = Image.open(image_file)
+        image.load()
+    if image.width <= max_size and image.height <= max_size:
+        return
+
+    image_format = image.format or "PNG"
+    image.thumbnail((max_size, max_size))
+    buffer = BytesIO()
+    image.save(buffer, format=image_format)
+    resized_name = default_storage.save(image_name, ContentFile(buffer.getvalue()))
+
+    # A troca só vale se a imagem ainda for a mesma; senão o arquivo novo ficaria órfão
+    if not current.update(profile_image=resized_name):
+        default_storage.delete(resized_name)
+        return
+    # update() não dispara post_save, então as versões são atualizadas aqui
+    bump_user_versions(user_id)
+    bump_feed_version()
+    delete_media_file(image_name)
+    logger.info(f"Imagem de perfil do usuário {user_id} redimensionada para {image.size}")
+
+@job
+def delete_media_file(name):
+    if is_default_profile_image(name):
+        return
+    default_storage.delete(name)
+    logger.info(f"Arquivo de mídia removido: {name}")
+
+@job
+def purge_deleted_tweets(tweet_ids):
+    report = purge_tweets(Tweet.objects.filter(id__in=tweet_ids))
+    logger.info(f"Tweets {tweet_ids} removidos definitivamente: {report}")
+
+def delete_tweets(queryset):
+    """
+    Esconde os tweets dos feeds na hora e agenda a remoção definitiva (tweets
+    e curtidas, em lotes) no worker. O UPDATE condicional de
+    soft_delete_tweets garante um único job mesmo com exclusões simultâneas.
+    """
+    tweet_ids = list(queryset.filter(is_deleted=False).values_list("id", flat=True))
+    if tweet_ids and soft_delete_tweets(Tweet.objects.filter(id__in=tweet_ids)):
+        purge_deleted_tweets.delay(tweet_ids)
+
+def delete_accounts(user_ids):
+    # Desativa já; tweets, curtidas e seguidores são apagados em lotes pelo worker
+    CustomUser.objects.filter(id__in=user_ids).update(is_active=False)
+    for user_id in user_ids:
+        purge_account.delay(user_id)
+
+@job
+def purge_account(user_id):
+    user = CustomUser.objects.filter(id=user_id).first()
+    if not user:
+        return
+    image_name = user.profile_image.name
+    purge_user(user)
+    delete_media_file(image_name)
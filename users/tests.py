@@ -1 +1,567 @@
-from django.test import TestCase
+import time
+from datetime import timedelta
+from unittest import mock
+from io import BytesIO, StringIO
+from django.conf import settings
+from django.contrib.admin.sites import site
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connections
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.db_router import PrimaryReplicaRouter, start_replica_reads, stop_replica_reads
+from core.middleware import CompressionMiddleware
+from core.renderers import FastJSONRenderer
+from .jobs import claim_tasks, enqueue, heartbeat, job, requeue_stale_tasks, run_task
+from .models import BackgroundTask, CustomUser, FeedVersion, Tweet
+from .purge import purge_tweets, purge_user, soft_delete_tweets
+from .tasks import delete_tweets, resize_profile_image
+
+job_calls = []
+
+@job
+def failing_job(label, failures):
+    job_calls.append(label)
+    if job_calls.count(label) <= failures:
+        raise RuntimeError(f"falha {label}")
+
+@job
+def slow_job(seconds):
+    time.sleep(seconds)
+
+# TransactionTestCase: a réplica espelha o default e precisa enxergar dados já commitados.
+# As configurações de teste (core.test_settings) definem o alias replica_1.
+class ReplicaRoutingTests(TransactionTestCase):
+    databases = {"default", *settings.DATABASE_REPLICAS}
+
+    def setUp(self):
+        self.replica = settings.DATABASE_REPLICAS[0]
+        self.user = CustomUser.objects.create_user("ana", "ana@example.com", "senha-segura")
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+
+    def age_last_write(self):
+        CustomUser.objects.filter(id=self.user.id).update(content_updated_at=timezone.now() - timedelta(minutes=5))
+
+    def test_reads_outside_views_use_primary(self):
+        self.assertEqual(PrimaryReplicaRouter().db_for_read(Tweet), "default")
+
+    def test_reads_and_writes_inside_replica_context(self):
+        router = PrimaryReplicaRouter()
+        token = start_replica_reads()
+        try:
+            self.assertIn(router.db_for_read(Tweet), settings.DATABASE_REPLICAS)
+            self.assertEqual(router.db_for_write(Tweet), "default")
+        finally:
+            stop_replica_reads(token)
+        self.assertEqual(router.db_for_read(Tweet), "default")
+
+    def test_feed_reads_go_to_replica(self):
+        self.age_last_write()
+        with CaptureQueriesContext(connections[self.replica]) as replica_queries:
+            response = self.client.get("/api/tweets/following/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(replica_queries.captured_queries)
+
+    def test_reads_pinned_to_primary_after_write(self):
+        self.client.post("/api/tweets/", {"content": "olá"}, format="json")
+        with CaptureQueriesContext(connections[self.replica]) as replica_queries:
+            response = self.client.get("/api/tweets/following/")
+        self.assertEqual(len(response.json()), 1)
+        self.assertFalse(replica_queries.captured_queries)
+
+    def test_unhealthy_replica_falls_back_to_primary(self):
+        self.age_last_write()
+        with mock.patch("core.db_router.replica_is_healthy", return_value=False):
+            with CaptureQueriesContext(connections[self.replica]) as replica_queries:
+                response = self.client.get("/api/user/detail/")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(replica_queries.captured_queries)
+
+    def test_user_detail_body_and_validators_read_from_replica(self):
+        self.age_last_write()
+        with CaptureQueriesContext(connections["default"]) as primary_queries:
+            with CaptureQueriesContext(connections[self.replica]) as replica_queries:
+                response = self.client.get("/api/user/detail/")
+        self.assertEqual(response.status_code, 200)
+        replica_sql = [query["sql"] for query in replica_queries.captured_queries]
+        self.assertTrue(any(sql.startswith('SELECT "users_customuser"."content_version"') for sql in replica_sql))
+        # No primário só fica a busca do usuário do token
+        self.assertEqual(len(primary_queries.captured_queries), 1)
+
+    def test_replica_is_released_after_unhandled_exception(self):
+        self.age_last_write()
+        with mock.patch("users.views.UserListView.get_queryset", side_effect=RuntimeError("falha")):
+            with self.assertRaises(RuntimeError):
+                self.client.get("/api/users/list/")
+        self.assertEqual(PrimaryReplicaRouter().db_for_read(CustomUser), "default")
+
+def api_client_for(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}")
+    return client
+
+@override_settings(DATABASE_REPLICAS=[])
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.ana = CustomUser.objects.create_user("ana", "ana@example.com", "senha-segura")
+        self.bia = CustomUser.objects.create_user("bia", "bia@example.com", "senha-segura")
+        self.ana.following.add(self.bia)
+        self.tweet = Tweet.objects.create(author=self.bia, content="olá")
+        self.client = api_client_for(self.ana)
+
+    def assertNotModified(self, url, etag):
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def assertModified(self, url, etag):
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_unchanged_resources_return_304(self):
+        for url in ("/api/tweets/", "/api/tweets/following/", "/api/user/detail/"):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotModified(url, response["ETag"])
+
+    def test_like_invalidates_feeds(self):
+        following = self.client.get("/api/tweets/following/")["ETag"]
+        tweets = self.client.get("/api/tweets/")["ETag"]
+        self.tweet.likes.add(self.ana)
+        self.assertModified("/api/tweets/following/", following)
+        self.assertModified("/api/tweets/", tweets)
+
+    def test_follow_invalidates_user_detail(self):
+        other = CustomUser.objects.create_user("caio", "caio@example.com", "senha-segura")
+        etag = self.client.get("/api/user/detail/")["ETag"]
+        api_client_for(other).post(f"/api/users/{self.ana.id}/follow/")
+        self.assertModified("/api/user/detail/", etag)
+
+    def test_followed_profile_update_invalidates_feed(self):
+        etag = self.client.get("/api/tweets/following/")["ETag"]
+        api_client_for(self.bia).put("/api/user/update-bio/", {"bio": "nova bio"}, format="json")
+        self.assertModified("/api/tweets/following/", etag)
+
+    def test_unrelated_tweet_keeps_following_feed(self):
+        other = CustomUser.objects.create_user("caio", "caio@example.com", "senha-segura")
+        etag = self.client.get("/api/tweets/following/")["ETag"]
+        Tweet.objects.create(author=other, content="não sigo")
+        self.assertNotModified("/api/tweets/following/", etag)
+
+    def test_stale_instance_save_does_not_rewind_version(self):
+        stale = CustomUser.objects.get(id=self.ana.id)
+        Tweet.objects.create(author=self.ana, content="novo")
+        etag = self.client.get("/api/user/detail/")["ETag"]
+        stale.bio = "alterada"
+        stale.save()
+        self.assertModified("/api/user/detail/", etag)
+        self.assertEqual(self.client.get("/api/user/detail/").json()["bio"], "alterada")
+
+    def test_change_in_same_second_invalidates_if_modified_since(self):
+        for url in ("/api/tweets/", "/api/tweets/following/", "/api/user/detail/"):
+            last_modified = self.client.get(url)["Last-Modified"]
+            self.tweet.likes.add(self.ana)
+            self.tweet.likes.remove(self.ana)
+            self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+
+    def test_unchanged_resources_honor_if_modified_since(self):
+        last_modified = self.client.get("/api/tweets/")["Last-Modified"]
+        self.assertEqual(self.client.get("/api/tweets/", HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+    def test_every_bump_counts_on_feed_version(self):
+        version = FeedVersion.objects.get(name="tweets").version
+        Tweet.objects.create(author=self.ana, content="um")
+        Tweet.objects.create(author=self.ana, content="dois")
+        self.assertEqual(FeedVersion.objects.get(name="tweets").version, version + 2)
+
+    def test_save_still_inserts_missing_or_forced_rows(self):
+        forced = CustomUser(username="caio", email="caio@example.com")
+        forced.save(force_insert=True)
+        self.assertTrue(CustomUser.objects.filter(id=forced.id).exists())
+
+        removed = CustomUser.objects.get(id=forced.id)
+        CustomUser.objects.filter(id=forced.id).delete()
+        removed.save()
+        self.assertTrue(CustomUser.objects.filter(id=forced.id).exists())
+
+    def test_normalized_shape_has_its_own_etag(self):
+        for url in ("/api/tweets/", "/api/tweets/following/"):
+            default = self.client.get(url)["ETag"]
+            normalized = self.client.get(url, {"shape": "normalized"})["ETag"]
+            self.assertNotEqual(default, normalized)
+            response = self.client.get(url, {"shape": "normalized"}, HTTP_IF_NONE_MATCH=default)
+            self.assertEqual(response.status_code, 200)
+
+@override_settings(DATABASE_REPLICAS=[])
+class NormalizedShapeTests(TestCase):
+    def setUp(self):
+        self.ana = CustomUser.objects.create_user("ana", "ana@example.com", "senha-segura")
+        self.bia = CustomUser.objects.create_user("bia", "bia@example.com", "senha-segura")
+        self.ana.following.add(self.bia)
+        for author in (self.ana, self.bia, self.bia):
+            Tweet.objects.create(author=author, content=f"de {author.username}")
+        self.client = api_client_for(self.ana)
+
+    def test_authors_are_sent_once_and_referenced_by_id(self):
+        for url in ("/api/tweets/", "/api/tweets/following/"):
+            data = self.client.get(url, {"shape": "normalized"}).json()
+            self.assertEqual(sorted(tweet["author"] for tweet in data["tweets"]), [self.ana.id, self.bia.id, self.bia.id])
+            self.assertEqual(set(data["authors"]), {str(self.ana.id), str(self.bia.id)})
+            self.assertEqual(data["authors"][str(self.bia.id)]["username"], "bia")
+
+    def test_default_shape_keeps_nested_authors(self):
+        data = self.client.get("/api/tweets/").json()
+        self.assertEqual({tweet["author"]["username"] for tweet in data}, {"ana", "bia"})
+
+class RendererTests(TestCase):
+    data = {
+        "texto": "linha\u2028separador\u2029parágrafo",
+        "lista": [1, 2.5, True, None],
+        "vazio": None,
+        "aninhado": {"criado_em": "2024-01-01T00:00:00Z"},
+    }
+
+    def test_output_matches_drf_renderer(self):
+        expected = JSONRenderer().render(self.data)
+        self.assertEqual(FastJSONRenderer().render(self.data), expected)
+        self.assertIn(b"\\u2028", expected)
+
+    def test_indent_and_none_fall_back_to_drf_renderer(self):
+        media_type = "application/json; indent=2"
+        self.assertEqual(
+            FastJSONRenderer().render(self.data, media_type),
+            JSONRenderer().render(self.data, media_type),
+        )
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+@override_settings(DATABASE_REPLICAS=[], COMPRESSION_MIN_SIZE=0)
+class CompressionTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user("ana", "ana@example.com", "senha-segura")
+
+    def test_large_responses_are_compressed(self):
+        for index in range(20):
+            Tweet.objects.create(author=self.user, content=f"tweet {index}")
+        response = api_client_for(self.user).get("/api/tweets/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+
+    def choose_encoding(self, accept_encoding):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(lambda request: None).choose_encoding(request)
+
+    def test_brotli_is_preferred_when_available(self):
+        fake_brotli = mock.Mock(compress=mock.Mock(return_value=b"br"))
+        with mock.patch("core.middleware.brotli", fake_brotli):
+            self.assertEqual(self.choose_encoding("gzip, br"), "br")
+            self.assertEqual(self.choose_encoding("br;q=0, gzip"), "gzip")
+            Tweet.objects.create(author=self.user, content="x" * 200)
+            response = api_client_for(self.user).get("/api/tweets/", HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual((response["Content-Encoding"], response.content), ("br", b"br"))
+        self.assertEqual(self.choose_encoding("gzip, br"), "gzip")
+
+    def test_zero_quality_disables_encoding(self):
+        self.assertIsNone(self.choose_encoding("gzip;q=0"))
+        self.assertIsNone(self.choose_encoding("*;q=0"))
+        self.assertEqual(self.choose_encoding("*"), "gzip")
+        Tweet.objects.create(author=self.user, content="x" * 200)
+        response = api_client_for(self.user).get("/api/tweets/", HTTP_ACCEPT_ENCODING="gzip;q=0, identity")
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_login_response_with_tokens_is_not_compressed(self):
+        response = APIClient().post(
+            "/api/auth/login/",
+            {"username": "ana", "password": "senha-segura"},
+            format="json",
+            HTTP_ACCEPT_ENCODING="br, gzip",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("no-store", response["Cache-Control"])
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertIn("access", response.json())
+
+@override_settings(TASKS_RETRY_DELAY=10, TASKS_MAX_ATTEMPTS=3, TASKS_STALE_AFTER=120)
+class BackgroundJobTests(TestCase):
+    def setUp(self):
+        job_calls.clear()
+
+    def enqueue_now(self, func, *args):
+        with self.captureOnCommitCallbacks(execute=True):
+            func.delay(*args)
+        return BackgroundTask.objects.latest("id")
+
+    def run_claimed(self):
+        for task in claim_tasks(10):
+            run_task(task)
+
+    def test_enqueue_waits_for_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            enqueue("users.tests.failing_job", ["a", 0])
+            self.assertFalse(BackgroundTask.objects.exists())
+        callbacks[0]()
+        self.assertEqual(BackgroundTask.objects.get().status, BackgroundTask.STATUS_PENDING)
+
+    def test_failed_task_is_retried_with_backoff(self):
+        task = self.enqueue_now(failing_job, "b", 1)
+        self.run_claimed()
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (BackgroundTask.STATUS_PENDING, 1))
+        self.assertAlmostEqual((task.run_after - timezone.now()).total_seconds(), 10, delta=2)
+        self.assertIn("falha b", task.last_error)
+
+        # Ainda no atraso: não é reivindicada
+        self.assertEqual(claim_tasks(10), [])
+        BackgroundTask.objects.filter(id=task.id).update(run_after=timezone.now())
+        self.run_claimed()
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (BackgroundTask.STATUS_DONE, 2))
+        self.assertEqual(job_calls, ["b", "b"])
+
+    def test_backoff_doubles_each_attempt(self):
+        task = self.enqueue_now(failing_job, "c", 5)
+        BackgroundTask.objects.filter(id=task.id).update(attempts=1)
+        self.run_claimed()
+        task.refresh_from_db()
+        self.assertAlmostEqual((task.run_after - timezone.now()).total_seconds(), 20, delta=2)
+
+    def test_task_fails_after_max_attempts(self):
+        task = self.enqueue_now(failing_job, "d", 10)
+        for _ in range(3):
+            BackgroundTask.objects.filter(id=task.id, status=BackgroundTask.STATUS_PENDING).update(run_after=timezone.now())
+            self.run_claimed()
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (BackgroundTask.STATUS_FAILED, 3))
+
+    def test_stale_task_without_heartbeat_is_requeued(self):
+        task = self.enqueue_now(failing_job, "e", 0)
+        claim_tasks(10)
+        BackgroundTask.objects.filter(id=task.id).update(heartbeat_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(requeue_stale_tasks(), 1)
+        task.refresh_from_db()
+        self.assertEqual(task.status, BackgroundTask.STATUS_PENDING)
+
+    def test_long_task_with_recent_heartbeat_is_not_requeued(self):
+        task = self.enqueue_now(failing_job, "f", 0)
+        claim_tasks(10)
+        BackgroundTask.objects.filter(id=task.id).update(started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale_tasks(), 0)
+        task.refresh_from_db()
+        self.assertEqual(task.status, BackgroundTask.STATUS_RUNNING)
+
+    def test_stale_task_out_of_attempts_is_failed(self):
+        task = self.enqueue_now(failing_job, "g", 0)
+        claim_tasks(10)
+        BackgroundTask.objects.filter(id=task.id).update(
+            attempts=3, heartbeat_at=timezone.now() - timedelta(minutes=5)
+        )
+        self.assertEqual(requeue_stale_tasks(), 0)
+        task.refresh_from_db()
+        self.assertEqual(task.status, BackgroundTask.STATUS_FAILED)
+
+class WorkerTests(TransactionTestCase):
+    def test_running_task_keeps_heartbeat_fresh(self):
+        enqueue("users.tests.slow_job", [0.3])
+        task = claim_tasks(1)[0]
+        started = task.heartbeat_at
+        with heartbeat(task, interval=0.05):
+            run_task(task)
+        task.refresh_from_db()
+        self.assertEqual(task.status, BackgroundTask.STATUS_DONE)
+        self.assertGreater(task.heartbeat_at, started)
+
+    @override_settings(TASKS_RETRY_DELAY=60)
+    def test_run_once_leaves_delayed_retries_queued(self):
+        job_calls.clear()
+        enqueue("users.tests.failing_job", ["h", 1])
+        output = StringIO()
+        call_command("run_jobs", "--once", "--poll-interval", "0.01", stdout=output)
+        task = BackgroundTask.objects.get()
+        self.assertEqual((task.status, task.attempts), (BackgroundTask.STATUS_PENDING, 1))
+        self.assertGreater(task.run_after, timezone.now())
+        self.assertIn("1 tarefas agendadas para depois", output.getvalue())
+
+    @override_settings(TASKS_RETRY_DELAY=0)
+    def test_run_once_runs_retries_that_become_due(self):
+        job_calls.clear()
+        enqueue("users.tests.failing_job", ["i", 1])
+        call_command("run_jobs", "--once", "--poll-interval", "0.01", stdout=StringIO())
+        self.assertEqual(BackgroundTask.objects.get().status, BackgroundTask.STATUS_DONE)
+        self.assertEqual(job_calls, ["i", "i"])
+
+def image_file(size):
+    buffer = BytesIO()
+    Image.new("RGB", (size, size)).save(buffer, format="PNG")
+    return ContentFile(buffer.getvalue(), name="foto.png")
+
+@override_settings(DATABASE_REPLICAS=[])
+class ProfileImageTests(TestCase):
+    def setUp(self):
+        self.ana = CustomUser.objects.create_user("ana", "ana@example.com", "senha-segura")
+        self.ana.profile_image.save("foto.png", image_file(32))
+        self.client = api_client_for(self.ana)
+
+    def upload(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.put("/api/user/update-profile-image/", {"profile_image": image_file(32)})
+
+    def test_resize_is_disabled_by_default(self):
+        old_image = self.ana.profile_image.name
+        self.assertEqual(self.upload().status_code, 200)
+        self.assertEqual(list(BackgroundTask.objects.values_list("name", "args")), [("users.tasks.delete_media_file", [old_image])])
+
+    @override_settings(PROFILE_IMAGE_MAX_SIZE=8)
+    def test_resize_replaces_image_and_removes_original(self):
+        original = self.ana.profile_image.name
+        resize_profile_image(self.ana.id, original)
+        self.ana.refresh_from_db()
+        self.assertNotEqual(self.ana.profile_image.name, original)
+        self.assertFalse(default_storage.exists(original))
+        with self.ana.profile_image.open("rb") as resized:
+            self.assertEqual(Image.open(resized).size, (8, 8))
+
+    @override_settings(PROFILE_IMAGE_MAX_SIZE=8)
+    def test_resize_of_replaced_image_leaves_no_orphan(self):
+        original = self.ana.profile_image.name
+        files_before = set(default_storage.listdir("profile_images")[1])
+
+        def replace_image(*args, **kwargs):
+            CustomUser.objects.filter(id=self.ana.id).update(profile_image="profile_images/outra.png")
+            return saved(*args, **kwargs)
+
+        saved = default_storage.save
+        with mock.patch.object(default_storage, "save", side_effect=replace_image):
+            resize_profile_image(self.ana.id, original)
+        self.assertEqual(CustomUser.objects.get(id=self.ana.id).profile_image.name, "profile_images/outra.png")
+        self.assertEqual(set(default_storage.listdir("profile_images")[1]), files_before)
+
+@override_settings(DATABASE_REPLICAS=[])
+class DeleteTweetTests(TestCase):
+    def setUp(self):
+        self.ana = CustomUser.objects.create_user("ana", "ana@example.com", "senha-segura")
+        self.tweet = Tweet.objects.create(author=self.ana, content="olá")
+        self.tweet.likes.add(self.ana)
+        self.client = api_client_for(self.ana)
+
+    def test_delete_hides_tweet_before_worker_runs(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f"/api/tweets/{self.tweet.id}/delete/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get("/api/tweets/following/").json(), [])
+        self.assertEqual(self.client.get("/api/tweets/").json(), [])
+        self.assertEqual(self.client.post(f"/api/tweets/{self.tweet.id}/like/").status_code, 404)
+        self.assertTrue(Tweet.objects.filter(id=self.tweet.id, is_deleted=True).exists())
+
+    def test_repeated_delete_enqueues_a_single_purge(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/tweets/{self.tweet.id}/delete/")
+            second = self.client.delete(f"/api/tweets/{self.tweet.id}/delete/")
+        self.assertEqual(second.status_code, 404)
+        self.assertEqual(BackgroundTask.objects.count(), 1)
+
+    def test_concurrent_delete_enqueues_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            delete_tweets(Tweet.objects.filter(id=self.tweet.id))
+            delete_tweets(Tweet.objects.filter(id=self.tweet.id))
+        self.assertEqual(BackgroundTask.objects.count(), 1)
+
+    def test_admin_delete_hides_tweet_and_enqueues_purge(self):
+        admin_user = CustomUser.objects.create_superuser("admin", "admin@example.com", "senha-segura")
+        self.client.force_login(admin_user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f"/admin/users/tweet/{self.tweet.id}/delete/", {"post": "yes"})
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Tweet.objects.filter(id=self.tweet.id, is_deleted=True).exists())
+        self.assertTrue(Tweet.likes.through.objects.filter(tweet_id=self.tweet.id).exists())
+        task = BackgroundTask.objects.get()
+        self.assertEqual((task.name, task.args), ("users.tasks.purge_deleted_tweets", [[self.tweet.id]]))
+
+@override_settings(DATABASE_REPLICAS=[], PURGE_BATCH_SIZE=2)
+class PurgeTests(TestCase):
+    def setUp(self):
+        self.ana = CustomUser.objects.create_user("ana", "ana@example.com", "senha-segura")
+        self.bia = CustomUser.objects.create_user("bia", "bia@example.com", "senha-segura")
+        self.caio = CustomUser.objects.create_user("caio", "caio@example.com", "senha-segura")
+        self.ana.following.add(self.bia)
+        self.caio.following.add(self.ana)
+        self.tweets = [Tweet.objects.create(author=self.ana, content=f"tweet {index}") for index in range(5)]
+        for tweet in self.tweets:
+            tweet.likes.add(self.bia, self.caio)
+        self.bia_tweet = Tweet.objects.create(author=self.bia, content="da bia")
+        self.bia_tweet.likes.add(self.ana)
+
+    def version(self, user):
+        return CustomUser.objects.values_list("content_version", flat=True).get(id=user.id)
+
+    def tweet_updates(self, queries):
+        return [query["sql"] for query in queries if query["sql"].startswith('UPDATE "users_tweet"')]
+
+    def test_soft_delete_runs_in_bounded_batches(self):
+        with CaptureQueriesContext(connections["default"]) as queries:
+            count = soft_delete_tweets(Tweet.objects.filter(author=self.ana))
+        self.assertEqual(count, 5)
+        self.assertEqual(len(self.tweet_updates(queries.captured_queries)), 3)
+        self.assertFalse(Tweet.objects.live().filter(author=self.ana).exists())
+        self.assertEqual(soft_delete_tweets(Tweet.objects.filter(author=self.ana)), 0)
+
+    def test_soft_delete_bumps_author_version(self):
+        before = self.version(self.ana)
+        soft_delete_tweets(Tweet.objects.filter(id=self.tweets[0].id))
+        self.assertGreater(self.version(self.ana), before)
+
+    def test_purge_tweets_only_removes_soft_deleted(self):
+        soft_delete_tweets(Tweet.objects.filter(id__in=[tweet.id for tweet in self.tweets[:3]]))
+        report = purge_tweets(Tweet.objects.all(), progress=lambda step, done: None)
+        self.assertEqual(report, {"likes": 6, "tweets": 3})
+        self.assertEqual(Tweet.objects.filter(author=self.ana).count(), 2)
+        self.assertEqual(Tweet.likes.through.objects.filter(tweet__author=self.ana).count(), 4)
+
+    def test_purge_user_removes_everything_and_bumps_related_versions(self):
+        progress = []
+        versions = {user.id: self.version(user) for user in (self.bia, self.caio)}
+        report = purge_user(self.ana, progress=lambda step, done: progress.append((step, done)))
+
+        self.assertEqual(report, {"likes_given": 1, "follows": 2, "likes": 10, "tweets": 5})
+        self.assertFalse(CustomUser.objects.filter(id=self.ana.id).exists())
+        self.assertFalse(Tweet.objects.filter(author_id=self.ana.id).exists())
+        self.assertEqual(Tweet.likes.through.objects.count(), 0)
+        self.assertFalse(self.caio.following.exists())
+        # bia perdeu um seguidor e uma curtida; caio deixou de seguir alguém
+        self.assertGreater(self.version(self.bia), versions[self.bia.id])
+        self.assertGreater(self.version(self.caio), versions[self.caio.id])
+        self.assertIn(("tweets", 5), progress)
+
+    def test_purge_invalidates_follower_user_detail(self):
+        client = api_client_for(self.caio)
+        etag = client.get("/api/user/detail/")["ETag"]
+        purge_user(self.ana, progress=lambda step, done: None)
+        self.assertEqual(client.get("/api/user/detail/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_admin_bulk_delete_only_deactivates_and_enqueues(self):
+        request = RequestFactory().post("/admin/users/customuser/")
+        model_admin = site._registry[CustomUser]
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connections["default"]) as queries:
+                model_admin.delete_queryset(request, CustomUser.objects.filter(id=self.ana.id))
+        self.assertEqual(self.tweet_updates(queries.captured_queries), [])
+        self.assertFalse(CustomUser.objects.get(id=self.ana.id).is_active)
+        task = BackgroundTask.objects.get()
+        self.assertEqual((task.name, task.args), ("users.tasks.purge_account", [self.ana.id]))
+        self.assertTrue(Tweet.objects.live().filter(author=self.ana).exists())
+
+    def test_admin_delete_view_skips_cascade_collector(self):
+        admin_user = CustomUser.objects.create_superuser("admin", "admin@example.com", "senha-segura")
+        self.client.force_login(admin_user)
+        url = f"/admin/users/customuser/{self.ana.id}/delete/"
+        with CaptureQueriesContext(connections["default"]) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertFalse([query for query in queries.captured_queries if "users_tweet" in query["sql"]])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post(url, {"post": "yes"}).status_code, 302)
+        self.assertFalse(CustomUser.objects.get(id=self.ana.id).is_active)
+        self.assertEqual(Tweet.objects.filter(author=self.ana).count(), 5)
+        self.assertEqual(BackgroundTask.objects.get().name, "users.tasks.purge_account")
@@ -4,7 +4,7 @@ from .views import (
     RegisterView, LoginView, LogoutView,
     TweetViewSet, FollowingTweetsView, LikeTweetView, UnlikeTweetView,
     UpdateProfileImageView, UpdateBioView, UserDetailView, DeleteTweetView,
-    UserListView, FollowToggleView
+    UserListView, FollowToggleView, TaskMetricsView
 )
 
 router = DefaultRouter()
@@ -26,6 +26,8 @@ urlpatterns = [
 
     path("user/update-profile-image/", UpdateProfileImageView.as_view(), name="update-profile-image"),
     path("user/update-bio/", UpdateBioView.as_view(), name="update-bio"),
+
+    path("tasks/metrics/", TaskMetricsView.as_view(), name="task-metrics"),
 ]
 
 urlpatterns += router.urls
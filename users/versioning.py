@@ -0,0 +1,98 @@
+import hashlib
+import logging
+from datetime import timedelta, timezone as dt_timezone
+from django.db.models import DateTimeField, F, Q, Value
+from django.db.models.functions import Greatest, Trunc
+from django.utils import timezone
+
+from .models import CustomUser, FeedVersion
+
+logger = logging.getLogger(__name__)
+
+TWEETS_FEED = "tweets"
+
+def _next_modified(field):
+    """
+    Last-Modified só tem precisão de segundos: duas mudanças no mesmo segundo
+    dariam a mesma data e If-Modified-Since responderia 304 com dado velho.
+    Por isso o valor avança sempre pelo menos um segundo inteiro.
+    """
+    now = timezone.now().replace(microsecond=0)
+    return Greatest(
+        Value(now, output_field=DateTimeField()),
+        # Truncar em UTC: no fuso atual o valor voltaria como hora local para o banco
+        Trunc(field, "second", output_field=DateTimeField(), tzinfo=dt_timezone.utc) + timedelta(seconds=1),
+        output_field=DateTimeField(),
+    )
+
+def bump_user_versions(*user_ids):
+    ids = {user_id for user_id in user_ids if user_id is not None}
+    if not ids:
+        return
+    CustomUser.objects.filter(id__in=ids).update(
+        content_version=F("content_version") + 1,
+        content_updated_at=_next_modified("content_updated_at"),
+    )
+    logger.debug(f"Versão de conteúdo incrementada para os usuários {sorted(ids)}")
+
+def bump_feed_version(name=TWEETS_FEED):
+    # A linha é criada pela migration 0002; um get_or_create aqui perderia incrementos concorrentes
+    FeedVersion.objects.filter(name=name).update(version=F("version") + 1, updated_at=_next_modified("updated_at"))
+    logger.debug(f"Versão do feed '{name}' incrementada")
+
+def _shape(request):
+    # O formato normalizado tem outro corpo, então precisa de outra ETag
+    return "-normalized" if request.GET.get("shape") == "normalized" else ""
+
+def _feed_validators(request):
+    # Calculado uma vez por requisição: o decorator condition chama etag e last_modified separadamente
+    if not hasattr(request, "_feed_validators"):
+        feed = FeedVersion.objects.filter(name=TWEETS_FEED).values_list("version", "updated_at").first()
+        version, updated_at = feed or (0, None)
+        request._feed_validators = (f"tweets-{request.user.id}-{version}{_shape(request)}", updated_at)
+    return request._feed_validators
+
+def tweets_etag(request, *args, **kwargs):
+    return _feed_validators(request)[0]
+
+def tweets_last_modified(request, *args, **kwargs):
+    return _feed_validators(request)[1]
+
+def _following_validators(request):
+    if not hasattr(request, "_following_validators"):
+        user = request.user
+        rows = list(
+            CustomUser.objects.filter(Q(id=user.id) | Q(id__in=user.following.values("id")))
+            .values_list("id", "content_version", "content_updated_at")
+        )
+        rows.sort()
+        digest = hashlib.md5(
+            ",".join(f"{user_id}:{version}" for user_id, version, _ in rows).encode(),
+            usedforsecurity=False,
+        ).hexdigest()
+        last_modified = max((updated_at for _, _, updated_at in rows), default=None)
+        request._following_validators = (f"following-{user.id}-{digest}{_shape(request)}", last_modified)
+    return request._following_validators
+
+def following_tweets_etag(request, *args, **kwargs):
+    return _following_validators(request)[0]
+
+def following_tweets_last_modified(request, *args, **kwargs):
+    return _following_validators(request)[1]
+
+def _user_detail_validators(request):
+    # request.user vem do primário; a versão precisa vir do mesmo banco (réplica) que o corpo
+    if not hasattr(request, "_user_detail_validators"):
+        user_id = request.user.id
+        version, updated_at = (
+            CustomUser.objects.filter(id=user_id).values_list("content_version", "content_updated_at").first()
+            or (0, None)
+        )
+        request._user_detail_validators = (f"user-{user_id}-{version}", updated_at)
+    return request._user_detail_validators
+
+def user_detail_etag(request, *args, **kwargs):
+    return _user_detail_validators(request)[0]
+
+def user_detail_last_modified(request, *args, **kwargs):
+    return _user_detail_validators(request)[1]
@@ -1,20 +1,60 @@
 import logging
+from datetime import timedelta
+from django.conf import settings
 from django.contrib.auth import authenticate
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_headers
 from rest_framework import status
 from rest_framework.generics import RetrieveAPIView, ListAPIView, DestroyAPIView
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated, SAFE_METHODS
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from core.db_router import start_replica_reads, stop_replica_reads
 from .models import CustomUser, Tweet
-from .serializers import RegisterSerializer, UserSerializer, TweetSerializer
+from .jobs import queue_metrics
+from .serializers import RegisterSerializer, UserSerializer, TweetSerializer, normalize_tweets
+from .tasks import delete_media_file, delete_tweets, is_default_profile_image, resize_profile_image
+from .versioning import (
+    tweets_etag, tweets_last_modified,
+    following_tweets_etag, following_tweets_last_modified,
+    user_detail_etag, user_detail_last_modified,
+)
 
 logger = logging.getLogger(__name__)
 
+def is_pinned_to_primary(user):
+    # content_updated_at muda a cada escrita do usuário (ver signals), então serve de marca da última escrita
+    if not user.is_authenticated:
+        return False
+    window = timedelta(seconds=settings.DATABASE_REPLICA_PIN_SECONDS)
+    return timezone.now() - user.content_updated_at < window
+
+class ReplicaReadMixin:
+    """Leituras (GET/HEAD) desta view vão para uma réplica, exceto logo após uma escrita do usuário."""
+
+    def dispatch(self, request, *args, **kwargs):
+        # finally: o DRF não chama finalize_response quando a exceção não é de API,
+        # e a réplica não pode vazar para a próxima requisição da mesma thread
+        self._replica_token = None
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            if self._replica_token is not None:
+                stop_replica_reads(self._replica_token)
+                self._replica_token = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and not is_pinned_to_primary(request.user):
+            self._replica_token = start_replica_reads()
+
 class RegisterView(APIView):
     permission_classes = [AllowAny]
 
@@ -45,7 +85,7 @@ class LoginView(APIView):
                 "refresh": str(refresh),
                 "access": str(refresh.access_token),
                 "user": UserSerializer(user, context={"request": request}).data
-            }, status=status.HTTP_200_OK)
+            }, status=status.HTTP_200_OK, headers={"Cache-Control": "no-store"})
 
         return Response({"error": "Credenciais inválidas"}, status=status.HTTP_401_UNAUTHORIZED)
 
@@ -63,12 +103,15 @@ class LogoutView(APIView):
                 return Response({"error": "Erro ao invalidar o token"}, status=status.HTTP_400_BAD_REQUEST)
         return Response({"error": "Token inválido"}, status=status.HTTP_400_BAD_REQUEST)
 
-class UserDetailView(RetrieveAPIView):
+class UserDetailView(ReplicaReadMixin, RetrieveAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = UserSerializer
 
+    @method_decorator(vary_on_headers("Authorization"))
+    @method_decorator(condition(etag_func=user_detail_etag, last_modified_func=user_detail_last_modified))
     def get(self, request, *args, **kwargs):
-        user = request.user
+        # Relido pelo roteador, para corpo e ETag virem do mesmo banco
+        user = get_object_or_404(CustomUser, id=request.user.id)
         data = UserSerializer(user, context={"request": request}).data
         data["followers"] = [{"id": u.id, "username": u.username} for u in user.followers.all()]
         data["following"] = [{"id": u.id, "username": u.username} for u in user.following.all()]
@@ -76,18 +119,18 @@ class UserDetailView(RetrieveAPIView):
         data["following_count"] = user.following.count()
         return Response(data, status=status.HTTP_200_OK)
 
-class UserListView(ListAPIView):
+class UserListView(ReplicaReadMixin, ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = UserSerializer
 
     def get_queryset(self):
-        return CustomUser.objects.exclude(id=self.request.user.id).order_by("username")
+        return CustomUser.objects.filter(is_active=True).exclude(id=self.request.user.id).order_by("username")
 
 class FollowToggleView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, user_id):
-        user_to_follow = get_object_or_404(CustomUser, id=user_id)
+        user_to_follow = get_object_or_404(CustomUser, id=user_id, is_active=True)
 
         if user_to_follow == request.user:
             return Response({"error": "Você não pode seguir a si mesmo."}, status=status.HTTP_400_BAD_REQUEST)
@@ -108,8 +151,15 @@ class UpdateProfileImageView(APIView):
         if 'profile_image' not in request.FILES:
             return Response({"error": "Imagem de perfil não fornecida"}, status=status.HTTP_400_BAD_REQUEST)
 
+        old_image = user.profile_image.name
         user.profile_image = request.FILES["profile_image"]
         user.save()
+
+        # Redimensionar a nova imagem (se ativado) e apagar a antiga não precisa segurar a resposta
+        if settings.PROFILE_IMAGE_MAX_SIZE:
+            resize_profile_image.delay(user.id, user.profile_image.name)
+        if not is_default_profile_image(old_image) and old_image != user.profile_image.name:
+            delete_media_file.delay(old_image)
         return Response(UserSerializer(user, context={"request": request}).data, status=status.HTTP_200_OK)
 
 class UpdateBioView(APIView):
@@ -126,42 +176,65 @@ class UpdateBioView(APIView):
         user.save()
         return Response(UserSerializer(user, context={"request": request}).data, status=status.HTTP_200_OK)
 
-class TweetViewSet(ModelViewSet):
+class NormalizedTweetListMixin:
+    """Permite ?shape=normalized, que envia os autores numa tabela separada."""
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get("shape") != "normalized":
+            return super().list(request, *args, **kwargs)
+
+        tweets = list(self.filter_queryset(self.get_queryset()))
+        return Response(normalize_tweets(tweets, self.get_serializer_context()), status=status.HTTP_200_OK)
+
+class TweetViewSet(ReplicaReadMixin, NormalizedTweetListMixin, ModelViewSet):
     serializer_class = TweetSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Tweet.objects.prefetch_related("likes").order_by("-created_at")
+        return Tweet.objects.live().select_related("author").prefetch_related("likes").order_by("-created_at")
+
+    @method_decorator(vary_on_headers("Authorization"))
+    @method_decorator(condition(etag_func=tweets_etag, last_modified_func=tweets_last_modified))
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    def perform_destroy(self, instance):
+        delete_tweets(Tweet.objects.filter(id=instance.id))
+
 class DeleteTweetView(DestroyAPIView):
     permission_classes = [IsAuthenticated]
 
     def delete(self, request, tweet_id):
-        tweet = get_object_or_404(Tweet, id=tweet_id)
+        tweet = get_object_or_404(Tweet.objects.live(), id=tweet_id)
         if tweet.author != request.user:
             return Response({"error": "Você não tem permissão para excluir este tweet."}, status=status.HTTP_403_FORBIDDEN)
 
-        tweet.delete()
+        delete_tweets(Tweet.objects.filter(id=tweet.id))
         logger.info(f"Tweet {tweet_id} excluído por {request.user.username}")
         return Response({"message": "Tweet excluído com sucesso!"}, status=status.HTTP_200_OK)
 
-class FollowingTweetsView(ListAPIView):
+class FollowingTweetsView(ReplicaReadMixin, NormalizedTweetListMixin, ListAPIView):
     serializer_class = TweetSerializer
     permission_classes = [IsAuthenticated]
 
+    @method_decorator(vary_on_headers("Authorization"))
+    @method_decorator(condition(etag_func=following_tweets_etag, last_modified_func=following_tweets_last_modified))
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     def get_queryset(self):
         user = self.request.user
         following = user.following.all()
-        return Tweet.objects.filter(author__in=following | CustomUser.objects.filter(id=user.id)).select_related("author").order_by('-created_at')
+        return Tweet.objects.live().filter(author__in=following | CustomUser.objects.filter(id=user.id)).select_related("author").order_by('-created_at')
 
 class LikeTweetView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, tweet_id):
-        tweet = get_object_or_404(Tweet, id=tweet_id)
+        tweet = get_object_or_404(Tweet.objects.live(), id=tweet_id)
         if request.user in tweet.likes.all():
             return Response({"error": "Você já curtiu este tweet!"}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -172,9 +245,15 @@ class UnlikeTweetView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, tweet_id):
-        tweet = get_object_or_404(Tweet, id=tweet_id)
+        tweet = get_object_or_404(Tweet.objects.live(), id=tweet_id)
         if request.user not in tweet.likes.all():
             return Response({"error": "Você ainda não curtiu este tweet!"}, status=status.HTTP_400_BAD_REQUEST)
 
         tweet.likes.remove(request.user)
         return Response({"message": "Curtida removida com sucesso!"}, status=status.HTTP_200_OK)
+
+class TaskMetricsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(queue_metrics(), status=status.HTTP_200_OK)